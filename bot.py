@@ -1,10 +1,19 @@
 import os
-import telebot
-import threading
-import time
+import asyncio
+import hmac
 import logging
+import secrets
+import sqlite3
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Final
+from urllib.parse import urlsplit
+from aiohttp import web
 from dotenv import load_dotenv
+from telebot import types
+from telebot.asyncio_helper import ApiTelegramException
+from telebot.async_telebot import AsyncTeleBot
 
 # Load environment variables
 load_dotenv()
@@ -18,320 +27,512 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS").split(",")] if os.getenv("ADMIN_IDS") else []
+ADMIN_IDS = frozenset(int(id.strip()) for id in os.getenv("ADMIN_IDS", "").split(",") if id.strip())
 DEFAULT_LINK = os.getenv("DEFAULT_LINK")
 MESSAGE_INTERVAL = int(os.getenv("MESSAGE_INTERVAL", 24)) * 3600  # Convert to seconds
+# Public hostname for webhook mode; falls back to long polling when unset
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST") or os.getenv("RENDER_EXTERNAL_HOSTNAME")
+PORT = int(os.getenv("PORT", 8080))
+WEBHOOK_PATH = "/webhook"
+# Telegram echoes this in X-Telegram-Bot-Api-Secret-Token on every webhook call
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+DB_PATH = os.getenv("DB_PATH", "bot.db")
+MAX_MESSAGE_LENGTH = 4000  # Stay under Telegram's 4096 UTF-16 unit cap
+MAX_LINK_LENGTH = 2048
+
+# Static replies, pre-split into plain text and bold entities so Telegram
+# doesn't have to parse Markdown on every send
+def utf16_len(text):
+    return len(text.encode("utf-16-le")) // 2
+
+def bold_entities(text):
+    """Strip `*bold*` markers from `text` and return it with matching MessageEntity spans."""
+    pieces = text.strip().split("*")
+    plain = ""
+    entities = []
+    for i, piece in enumerate(pieces):
+        if i % 2:
+            entities.append(types.MessageEntity(type="bold", offset=utf16_len(plain), length=utf16_len(piece)))
+        plain += piece
+    return plain, entities
+
+def styled(*segments):
+    """Join `(text, bold)` segments into plain text plus bold spans; safe for user-supplied text."""
+    plain = ""
+    entities = []
+    for text, bold in segments:
+        if bold and text:
+            entities.append(types.MessageEntity(type="bold", offset=utf16_len(plain), length=utf16_len(text)))
+        plain += text
+    return plain, entities
+
+ADMIN_START: Final = bold_entities("""
+👑 *Admin Control Panel* 👑
+
+📊 *Bot Management*:
+/start - Show this panel
+/stats - View bot statistics
+/interval [hours] - Change posting interval
+
+🔗 *Link Management*:
+/setlink [url] - Set custom link for this group
+/defaultlink - Reset to default link
+/link - Show current link
+
+👥 *User Tools*:
+/myid - Show your Telegram ID
+/help - Show help for all users
+""")
+
+USER_START: Final = bold_entities("""
+🤖 *Welcome to Link Sharing Bot* 🌐
+
+🔗 *Available Commands*:
+/link - Show current group link
+/help - Show detailed help
+/myid - Show your Telegram ID
+
+📢 The bot automatically shares links in this group.
+Admins can customize the link using /setlink
+""")
+
+ADMIN_HELP: Final = bold_entities("""
+🛠️ *Admin Help Menu* 🛠️
+
+I'm a link-sharing bot that automatically posts links in groups.
+
+🔧 *Admin Commands*:
+/stats - View bot statistics
+/interval [hours] - Change posting frequency
+/setlink [url] - Set custom group link
+/defaultlink - Reset to default link
+
+ℹ️ *General Commands*:
+/link - Show current link
+/myid - Show your Telegram ID
+/help - Show this message
+""")
+
+USER_HELP: Final = bold_entities("""
+ℹ️ *User Help Menu* ℹ️
+
+I'm a link-sharing bot that automatically posts links in this group.
+
+📋 *Available Commands*:
+/link - Show current group link
+/myid - Show your Telegram ID
+/help - Show this message
+
+Need help? Contact the group admins.
+""")
 
 # Initialize bot
-bot = telebot.TeleBot(BOT_TOKEN)
+bot = AsyncTeleBot(BOT_TOKEN)
+BOT_ID = None  # Filled once at startup by main()
 
 # In-memory storage
-ACTIVE_GROUPS = set()  # Stores active group IDs
-GROUP_LINKS = {}       # {group_id: custom_link}
-GROUP_INFO = {}        # {group_id: {"title": group_name, "link": current_link}}
-LAST_MESSAGE_TIMES = {}
+# Only touched from the asyncio event loop (handlers, webhook and scheduler
+# all run on it), so no locking is needed
+@dataclass(slots=True)
+class GroupState:
+    title: str
+    link: str | None = None  # Custom link; None follows DEFAULT_LINK
+    last_sent: float | None = None  # time.monotonic() of the last post
+    active: bool = False
+
+GROUPS = {}            # {group_id: GroupState}, written through to SQLite
+ADMIN_CACHE_TTL = 300  # Seconds to trust a fetched admin status
+_ADMIN_CACHE = {}      # {(group_id, user_id): (fetched_at, is_admin)}
+
+# Telegram allows ~30 messages per second across all chats for one bot
+SEND_RATE = 30
+
+class RateLimiter:
+    """Token bucket refilled at `rate` tokens per second."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+SEND_SEM = asyncio.Semaphore(SEND_RATE)
+limiter = RateLimiter(SEND_RATE)
+
+# One posting task per active group; the event is set by /interval so the
+# task stops sleeping on the old interval
+GROUP_TIMERS = {}      # {group_id: (task, interval_changed_event)}
+
+# Persistent storage
+db = sqlite3.connect(DB_PATH, isolation_level=None)
+db.execute("PRAGMA journal_mode=WAL")
+db.execute("PRAGMA synchronous=NORMAL")
+db.execute(
+    "CREATE TABLE IF NOT EXISTS groups("
+    "chat_id INTEGER PRIMARY KEY, title TEXT, link TEXT, last_sent TEXT, active INTEGER)"
+)
+
+# last_sent is monotonic in memory; the database keeps wall-clock ISO strings
+def to_wall_clock(mono):
+    return datetime.fromtimestamp(time.time() - (time.monotonic() - mono)).isoformat()
+
+def from_wall_clock(iso):
+    return time.monotonic() - (datetime.now() - datetime.fromisoformat(iso)).total_seconds()
+
+def load_groups():
+    rows = db.execute("SELECT chat_id, title, link, last_sent, active FROM groups")
+    for chat_id, title, link, last_sent, active in rows:
+        GROUPS[chat_id] = GroupState(
+            title=title,
+            # Rows written before overrides were tracked hold the default itself
+            link=None if link == DEFAULT_LINK else link,
+            last_sent=from_wall_clock(last_sent) if last_sent is not None else None,
+            active=bool(active)
+        )
+    logger.info(f"Loaded {len(GROUPS)} groups from {DB_PATH}")
+
+def save_group(chat_id):
+    group = GROUPS[chat_id]
+    db.execute(
+        "INSERT OR REPLACE INTO groups(chat_id, title, link, last_sent, active) VALUES (?, ?, ?, ?, ?)",
+        (chat_id, group.title, group.link,
+         to_wall_clock(group.last_sent) if group.last_sent is not None else None, int(group.active))
+    )
 
 # Helper functions
-def is_admin(user_id):
-    return user_id in ADMIN_IDS
+def get_group(chat):
+    group = GROUPS.get(chat.id)
+    if group is None:
+        group = GROUPS[chat.id] = GroupState(title=chat.title)
+    return group
+
+is_admin = ADMIN_IDS.__contains__
 
-def is_group_admin(message):
+async def is_group_admin(message):
     if message.chat.type not in ['group', 'supergroup']:
         return False
+    key = (message.chat.id, message.from_user.id)
+    now = time.monotonic()
+    entry = _ADMIN_CACHE.get(key)
+    if entry and now - entry[0] < ADMIN_CACHE_TTL:
+        return entry[1]
     try:
-        admins = bot.get_chat_administrators(message.chat.id)
-        return any(admin.user.id == message.from_user.id for admin in admins)
+        member = await bot.get_chat_member(message.chat.id, message.from_user.id)
+        result = member.status in ("creator", "administrator")
+        # Drop expired entries so the cache only holds recently active admins
+        for stale in [k for k, (fetched_at, _) in _ADMIN_CACHE.items() if now - fetched_at >= ADMIN_CACHE_TTL]:
+            del _ADMIN_CACHE[stale]
+        _ADMIN_CACHE[key] = (now, result)
+        return result
     except Exception as e:
         logger.error(f"Error checking admin status: {e}")
         return False
 
+def split_message(parts, limit=MAX_MESSAGE_LENGTH):
+    """Join `parts` into as few messages as fit under Telegram's length cap."""
+    chunks = []
+    current = []
+    size = 0
+    for part in parts:
+        part_size = utf16_len(part)
+        if current and size + part_size > limit:
+            chunks.append("".join(current))
+            current = []
+            size = 0
+        current.append(part)
+        size += part_size
+    chunks.append("".join(current))
+    return chunks
+
 def get_next_post_time(chat_id):
-    if chat_id not in LAST_MESSAGE_TIMES:
+    group = GROUPS.get(chat_id)
+    if group is None or group.last_sent is None:
         return "soon (not posted yet)"
-    next_time = LAST_MESSAGE_TIMES[chat_id] + timedelta(seconds=MESSAGE_INTERVAL)
+    remaining = MESSAGE_INTERVAL - (time.monotonic() - group.last_sent)
+    next_time = datetime.now() + timedelta(seconds=max(0, remaining))
     return next_time.strftime("%Y-%m-%d %H:%M:%S")
 
-def send_welcome_and_link(chat_id):
-    try:
-        chat = bot.get_chat(chat_id)
-        GROUP_INFO[chat_id] = {
-            "title": chat.title,
-            "link": GROUP_LINKS.get(chat_id, DEFAULT_LINK)
-        }
-        
-        welcome_msg = "🤖 *Link Sharing Bot Activated!* \n\n" \
-                     "I'll automatically share links in this group.\n" \
-                     f"Current link: {GROUP_INFO[chat_id]['link']}\n\n" \
-                     "Admins can use /setlink to change the URL"
-        
-        bot.send_message(chat_id, welcome_msg, parse_mode="Markdown")
-        
-        # Send first link immediately
-        send_link_to_group(chat_id)
-    except Exception as e:
-        logger.error(f"Error sending welcome to {chat_id}: {e}")
+# Only the header is bold and it precedes the link, so the spans never move
+LINK_HEADER, LINK_ENTITIES = bold_entities("📢 *Group Link*")
 
-def send_link_to_group(chat_id):
+async def send_link_to_group(chat_id, retry=True):
+    group = GROUPS[chat_id]
+    message = f"{LINK_HEADER}\n\n🔗 {group.link or DEFAULT_LINK}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}"
     try:
-        current_link = GROUP_LINKS.get(chat_id, DEFAULT_LINK)
-        message = f"📢 *Group Link*\n\n🔗 {current_link}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        bot.send_message(chat_id, message, parse_mode="Markdown")
-        LAST_MESSAGE_TIMES[chat_id] = datetime.now()
-        logger.info(f"Sent link to group {chat_id}")
-    except Exception as e:
-        logger.error(f"Error sending to group {chat_id}: {e}")
-        ACTIVE_GROUPS.discard(chat_id)
+        async with SEND_SEM:
+            await limiter.acquire()
+            await bot.send_message(chat_id, message, entities=LINK_ENTITIES)
+    except ApiTelegramException as e:
+        if e.error_code != 429 or not retry:
+            raise
+        # Flood control: wait as long as Telegram asks, then retry once
+        retry_after = e.result_json.get("parameters", {}).get("retry_after", 5)
+        logger.warning(f"Rate limited on group {chat_id}, retrying in {retry_after}s")
+        await asyncio.sleep(retry_after)
+        return await send_link_to_group(chat_id, retry=False)
+    group.last_sent = time.monotonic()
+    save_group(chat_id)
+    logger.info(f"Sent link to group {chat_id}")
 
 # Command handlers
-@bot.message_handler(commands=['help'])
-def send_help(message):
-    help_text = """
-🤖 *Bot Commands*:
-
-/help - Show this help
-/link - Show current link
-/setlink [url] - Set custom link (admins)
-/defaultlink - Reset to default link (admins)
-/interval [hours] - Change interval (admins)
-/stats - Show statistics (admins)
-"""
-    bot.reply_to(message, help_text, parse_mode="Markdown")
-
 @bot.message_handler(commands=['myid'])
-def show_user_id(message):
-    bot.reply_to(message, f"👤 Your Telegram ID: `{message.from_user.id}`", parse_mode="Markdown")
+async def show_user_id(message):
+    await bot.reply_to(message, f"👤 Your Telegram ID: `{message.from_user.id}`", parse_mode="Markdown")
 
 @bot.message_handler(commands=['link'])
-def show_link(message):
-    current_link = GROUP_LINKS.get(message.chat.id, DEFAULT_LINK)
-    bot.reply_to(message, f"🔗 Current link:\n{current_link}")
+async def show_link(message):
+    group = GROUPS.get(message.chat.id)
+    current_link = group.link if group and group.link else DEFAULT_LINK
+    await bot.reply_to(message, f"🔗 Current link:\n{current_link}")
 
 @bot.message_handler(commands=['setlink'])
-def set_link(message):
-    if not (is_admin(message.from_user.id) or is_group_admin(message)):
-        bot.reply_to(message, "🚫 Admin only command!")
+async def set_link(message):
+    if not (is_admin(message.from_user.id) or await is_group_admin(message)):
+        await bot.reply_to(message, "🚫 Admin only command!")
+        return
+    if message.chat.type not in ['group', 'supergroup']:
+        await bot.reply_to(message, "🚫 Use /setlink inside a group")
         return
     
     try:
         new_link = message.text.split()[1]
-        if not new_link.startswith(('http://', 'https://')):
+        parts = urlsplit(new_link)
+        if parts.scheme not in ("http", "https") or not parts.netloc or len(new_link) > MAX_LINK_LENGTH:
             raise ValueError("Invalid URL format")
         
-        GROUP_LINKS[message.chat.id] = new_link
-        if message.chat.id in GROUP_INFO:
-            GROUP_INFO[message.chat.id]["link"] = new_link
-        bot.reply_to(message, f"✅ Link updated to:\n{new_link}")
+        get_group(message.chat).link = new_link
+        save_group(message.chat.id)
+        await bot.reply_to(message, f"✅ Link updated to:\n{new_link}")
     except (IndexError, ValueError):
-        bot.reply_to(message, "Usage: /setlink https://example.com")
+        await bot.reply_to(message, "Usage: /setlink https://example.com")
 
 @bot.message_handler(commands=['defaultlink'])
-def default_link(message):
-    if not (is_admin(message.from_user.id) or is_group_admin(message)):
-        bot.reply_to(message, "🚫 Admin only command!")
+async def default_link(message):
+    if not (is_admin(message.from_user.id) or await is_group_admin(message)):
+        await bot.reply_to(message, "🚫 Admin only command!")
         return
     
-    if message.chat.id in GROUP_LINKS:
-        del GROUP_LINKS[message.chat.id]
-    if message.chat.id in GROUP_INFO:
-        GROUP_INFO[message.chat.id]["link"] = DEFAULT_LINK
-    bot.reply_to(message, f"✅ Reset to default link:\n{DEFAULT_LINK}")
+    group = GROUPS.get(message.chat.id)
+    if group:
+        group.link = None
+        save_group(message.chat.id)
+    await bot.reply_to(message, f"✅ Reset to default link:\n{DEFAULT_LINK}")
 
 @bot.message_handler(commands=['interval'])
-def set_interval(message):
-    if not (is_admin(message.from_user.id) or is_group_admin(message)):
-        bot.reply_to(message, "🚫 Admin only command!")
+async def set_interval(message):
+    if not (is_admin(message.from_user.id) or await is_group_admin(message)):
+        await bot.reply_to(message, "🚫 Admin only command!")
         return
     
     try:
         hours = int(message.text.split()[1])
+        if hours < 1:
+            raise ValueError("Interval must be at least one hour")
         global MESSAGE_INTERVAL
         MESSAGE_INTERVAL = hours * 3600
-        bot.reply_to(message, f"⏰ Posting interval set to {hours} hours")
+        for _, interval_changed in GROUP_TIMERS.values():
+            interval_changed.set()
+        await bot.reply_to(message, f"⏰ Posting interval set to {hours} hours")
     except (IndexError, ValueError):
-        bot.reply_to(message, "Usage: /interval 24 (sets to 24 hours)")
+        await bot.reply_to(message, "Usage: /interval 24 (sets to 24 hours)")
 
 @bot.message_handler(commands=['stats'])
-def show_stats(message):
+async def show_stats(message):
     if not is_admin(message.from_user.id):
-        bot.reply_to(message, "🚫 Admin only command!")
+        await bot.reply_to(message, "🚫 Admin only command!")
         return
     
-    stats_text = f"""
-📊 *Bot Statistics*:
-
-• Active groups: {len(ACTIVE_GROUPS)}
-• Posting interval: {MESSAGE_INTERVAL//3600} hours
-• Next post here: {get_next_post_time(message.chat.id)}
-
-📋 *Group Links*:
-"""
-    for group_id, info in GROUP_INFO.items():
-        stats_text += f"\n- {info['title']}: {info['link']}"
+    active_groups = [group for group in GROUPS.values() if group.active]
+    header, entities = styled(
+        ("📊 ", False), ("Bot Statistics", True),
+        (f":\n\n• Active groups: {len(active_groups)}\n"
+         f"• Posting interval: {MESSAGE_INTERVAL//3600} hours\n"
+         f"• Next post here: {get_next_post_time(message.chat.id)}\n\n📋 ", False),
+        ("Group Links", True), (":\n", False)
+    )
+    parts = [header]
+    parts.extend(f"\n- {group.title}: {group.link or DEFAULT_LINK}" for group in active_groups)
     
-    bot.reply_to(message, stats_text, parse_mode="Markdown")
+    chunks = split_message(parts)
+    # The header, and with it every bold span, always lands in the first chunk
+    await bot.reply_to(message, chunks[0], entities=entities)
+    for chunk in chunks[1:]:
+        await bot.send_message(message.chat.id, chunk)
 
 # Automatic link sending
-def send_links_periodically():
-    while True:
+async def wait_until_due(chat_id, interval_changed):
+    """Sleep until the group's next post is due, re-reading MESSAGE_INTERVAL whenever /interval changes it."""
+    group = GROUPS[chat_id]
+    while group.last_sent is not None:
+        remaining = MESSAGE_INTERVAL - (time.monotonic() - group.last_sent)
+        if remaining <= 0:
+            return
+        try:
+            await asyncio.wait_for(interval_changed.wait(), remaining)
+        except asyncio.TimeoutError:
+            return
+        finally:
+            interval_changed.clear()
+
+async def group_loop(chat_id, interval_changed):
+    group = GROUPS[chat_id]
+    while group.active:
+        await wait_until_due(chat_id, interval_changed)
         try:
-            for group_id in list(ACTIVE_GROUPS):
-                send_link_to_group(group_id)
-            time.sleep(MESSAGE_INTERVAL)
+            await send_link_to_group(chat_id)
+        except ApiTelegramException as e:
+            logger.error(f"Error sending to group {chat_id}: {e}")
+            # Only stop posting when the chat is gone or the bot was kicked/muted
+            if e.error_code in (400, 403):
+                group.active = False
+                save_group(chat_id)
+                GROUP_TIMERS.pop(chat_id, None)
+                return
+            await asyncio.sleep(60)
         except Exception as e:
-            logger.error(f"Error in scheduler: {e}")
-            time.sleep(60)
+            logger.error(f"Error sending to group {chat_id}: {e}")
+            await asyncio.sleep(60)
 
-# Group management
-@bot.message_handler(content_types=['new_chat_members'])
-def new_member(message):
-    for member in message.new_chat_members:
-        if member.id == bot.get_me().id:
-            ACTIVE_GROUPS.add(message.chat.id)
-            send_welcome_and_link(message.chat.id)
+def start_group_timer(chat_id):
+    timer = GROUP_TIMERS.get(chat_id)
+    if timer and not timer[0].done():
+        return
+    interval_changed = asyncio.Event()
+    task = asyncio.create_task(group_loop(chat_id, interval_changed))
+    GROUP_TIMERS[chat_id] = (task, interval_changed)
+
+def stop_group_timer(chat_id):
+    timer = GROUP_TIMERS.pop(chat_id, None)
+    if timer:
+        timer[0].cancel()
 
+# Group management
 @bot.message_handler(content_types=['left_chat_member'])
-def left_member(message):
-    if message.left_chat_member.id == bot.get_me().id:
-        ACTIVE_GROUPS.discard(message.chat.id)
-        if message.chat.id in GROUP_INFO:
-            del GROUP_INFO[message.chat.id]
+async def left_member(message):
+    if message.left_chat_member.id == BOT_ID:
+        for key in [key for key in _ADMIN_CACHE if key[0] == message.chat.id]:
+            del _ADMIN_CACHE[key]
+        group = GROUPS.get(message.chat.id)
+        if group:
+            group.active = False
+            save_group(message.chat.id)
+        stop_group_timer(message.chat.id)
         logger.info(f"Removed from group {message.chat.id}")
 
 
 # Enhanced start command
 @bot.message_handler(commands=['start'])
-def start_command(message):
-    if is_admin(message.from_user.id):
-        # Admin menu
-        admin_text = """
-👑 *Admin Control Panel* 👑
-
-📊 *Bot Management*:
-/start - Show this panel
-/stats - View bot statistics
-/interval [hours] - Change posting interval
-
-🔗 *Link Management*:
-/setlink [url] - Set custom link for this group
-/defaultlink - Reset to default link
-/link - Show current link
-
-👥 *User Tools*:
-/myid - Show your Telegram ID
-/help - Show help for all users
-"""
-        bot.reply_to(message, admin_text, parse_mode="Markdown")
-    else:
-        # User menu
-        user_text = """
-🤖 *Welcome to Link Sharing Bot* 🌐
-
-🔗 *Available Commands*:
-/link - Show current group link
-/help - Show detailed help
-/myid - Show your Telegram ID
-
-📢 The bot automatically shares links in this group.
-Admins can customize the link using /setlink
-"""
-        bot.reply_to(message, user_text, parse_mode="Markdown")
+async def start_command(message):
+    text, entities = ADMIN_START if is_admin(message.from_user.id) else USER_START
+    await bot.reply_to(message, text, entities=entities)
     
     # Activate group if in a group chat
     if message.chat.type in ['group', 'supergroup']:
-        ACTIVE_GROUPS.add(message.chat.id)
-        if message.chat.id not in GROUP_INFO:
-            send_welcome_and_link(message.chat.id)
+        group = get_group(message.chat)
+        group.active = True
+        save_group(message.chat.id)
+        # A record may exist from /setlink alone; only a sent post means we welcomed it
+        if group.last_sent is None:
+            await send_welcome_and_link(message.chat.id)
+        start_group_timer(message.chat.id)
 
 # Update help command to be user-friendly
 @bot.message_handler(commands=['help'])
-def send_help(message):
-    if is_admin(message.from_user.id):
-        help_text = """
-🛠️ *Admin Help Menu* 🛠️
+async def send_help(message):
+    text, entities = ADMIN_HELP if is_admin(message.from_user.id) else USER_HELP
+    await bot.reply_to(message, text, entities=entities)
 
-I'm a link-sharing bot that automatically posts links in groups.
 
-🔧 *Admin Commands*:
-/stats - View bot statistics
-/interval [hours] - Change posting frequency
-/setlink [url] - Set custom group link
-/defaultlink - Reset to default link
-
-ℹ️ *General Commands*:
-/link - Show current link
-/myid - Show your Telegram ID
-/help - Show this message
-"""
-    else:
-        help_text = """
-ℹ️ *User Help Menu* ℹ️
 
-I'm a link-sharing bot that automatically posts links in this group.
-
-📋 *Available Commands*:
-/link - Show current group link
-/myid - Show your Telegram ID
-/help - Show this message
-
-Need help? Contact the group admins.
-"""
-    bot.reply_to(message, help_text, parse_mode="Markdown")
-
-
-
-def send_welcome_and_link(chat_id):
+async def send_welcome_and_link(chat_id, include_admin_tip=False):
     try:
-        chat = bot.get_chat(chat_id)
-        GROUP_INFO[chat_id] = {
-            "title": chat.title,
-            "link": GROUP_LINKS.get(chat_id, DEFAULT_LINK)
-        }
+        chat = await bot.get_chat(chat_id)
+        group = get_group(chat)
+        group.title = chat.title
+        save_group(chat_id)
         
-        # Send the link immediately in clean format
-        link_msg = f"""
-🌟 *Welcome to {chat.title}!* 🌟
-
-Here's our group link:
-🔗 {GROUP_INFO[chat_id]['link']}
-
-• Share with friends
-• Join anytime
-• Link never expires
-"""
-        bot.send_message(chat_id, link_msg, parse_mode="Markdown")
+        # Send the link immediately in clean format; title and link are user
+        # input, so they go out as plain text rather than through Markdown
+        segments = [
+            ("🌟 ", False), (f"Welcome to {chat.title}!", True),
+            (f" 🌟\n\nHere's our group link:\n🔗 {group.link or DEFAULT_LINK}\n\n"
+             "• Share with friends\n• Join anytime\n• Link never expires\n", False)
+        ]
+        if include_admin_tip:
+            segments += [("\n🛠 ", False), ("Admin Tip", True), (": Use /setlink to change this group's link", False)]
+        link_msg, entities = styled(*segments)
+        await bot.send_message(chat_id, link_msg, entities=entities)
         
         # Update last message time
-        LAST_MESSAGE_TIMES[chat_id] = datetime.now()
+        group.last_sent = time.monotonic()
+        save_group(chat_id)
         logger.info(f"Auto-sent link to new group {chat_id}")
     except Exception as e:
         logger.error(f"Error sending welcome to {chat_id}: {e}")
 
 # Modified group join handler
 @bot.message_handler(content_types=['new_chat_members'])
-def new_member(message):
-    for member in message.new_chat_members:
-        if member.id == bot.get_me().id:
-            ACTIVE_GROUPS.add(message.chat.id)
-            # Send link immediately without any command
-            send_welcome_and_link(message.chat.id)
-            # Also send brief help for admins
-            if is_admin(message.from_user.id) or is_group_admin(message):
-                bot.send_message(
-                    message.chat.id,
-                    "🛠 *Admin Tip*: Use /setlink to change this group's link",
-                    parse_mode="Markdown"
-                )
+async def new_member(message):
+    if any(member.id == BOT_ID for member in message.new_chat_members):
+        get_group(message.chat).active = True
+        save_group(message.chat.id)
+        # Send link immediately without any command, with a tip if an admin added us
+        is_adm = is_admin(message.from_user.id) or await is_group_admin(message)
+        await send_welcome_and_link(message.chat.id, include_admin_tip=is_adm)
+        start_group_timer(message.chat.id)
+
+# Webhook endpoint
+async def webhook_handler(request):
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(secret, WEBHOOK_SECRET):
+        return web.Response(status=403)
+    update = types.Update.de_json(await request.json())
+    await bot.process_new_updates([update])
+    return web.Response()
+
+async def run_webhook():
+    await bot.remove_webhook()
+    await bot.set_webhook(url=f"https://{WEBHOOK_HOST}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET)
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, webhook_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", PORT).start()
+    logger.info(f"Webhook listening on port {PORT}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
 
 # Start the bot
+async def main():
+    global BOT_ID
+    BOT_ID = (await bot.get_me()).id
+    load_groups()
+    for chat_id, group in GROUPS.items():
+        if group.active:
+            start_group_timer(chat_id)
+    try:
+        if WEBHOOK_HOST:
+            await run_webhook()
+        else:
+            await bot.remove_webhook()
+            await bot.infinity_polling(interval=1)
+    finally:
+        for chat_id in list(GROUP_TIMERS):
+            stop_group_timer(chat_id)
+
 if __name__ == "__main__":
     logger.info("Starting bot...")
-    scheduler = threading.Thread(target=send_links_periodically)
-    scheduler.daemon = True
-    scheduler.start()
-    
-    while True:
-        try:
-            bot.polling(none_stop=True)
-        except Exception as e:
-            logger.error(f"Bot crashed: {e}")
-            time.sleep(15)
\ No newline at end of file
+    asyncio.run(main())